@@ -0,0 +1,201 @@
+# aggregation.py
+# Agrégats de la table éditée, tenus à jour à partir de l'état du data_editor.
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+# Les dates saisies dans l'éditeur se répètent (quelques dizaines de mois) : une analyse par valeur
+@lru_cache(maxsize=4096)
+def _parse_date_text(text):
+    return pd.to_datetime(text, errors="coerce")
+
+
+def parse_date_value(value):
+    return pd.NaT if value is None else _parse_date_text(str(value))
+
+
+def parse_number_value(value):
+    try:
+        return np.nan if value is None else float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class IncrementalAggregator:
+    """Somme de `valeur` par (categorie, date) sur la table passée au data_editor.
+
+    Le groupby complet n'est fait qu'une fois, à la construction. Ensuite
+    `apply(editor_state)` compare l'état du data_editor (edited_rows,
+    added_rows, deleted_rows) à celui du dernier appel et ne retire / ajoute
+    que la contribution des lignes qui ont changé : O(lignes modifiées).
+    Même sémantique que groupby(...).sum() : clés NaN/NaT ignorées, valeurs
+    NaN comptées comme 0.
+    """
+
+    def __init__(self, base, on_delta=None):
+        # on_delta(categorie, date, delta) est appelé à chaque variation d'une somme
+        self._on_delta = on_delta
+        # Vues sur les colonnes de la base partagée (codes de catégorie, pas de tableau d'objets) :
+        # rien n'est copié par session tant que les dtypes sont déjà les bons
+        categorie = base["categorie"]
+        if isinstance(categorie.dtype, pd.CategoricalDtype):
+            self._category_codes = categorie.cat.codes.to_numpy()
+            self._category_names = categorie.cat.categories
+        else:
+            self._category_codes, self._category_names = pd.factorize(categorie)
+        self._dates = base["date"].to_numpy()
+        self._values = base["valeur"].to_numpy(dtype=np.float64)
+        grouped = base.groupby(["categorie", "date"], observed=True)["valeur"].agg(["sum", "size"])
+        self._sums = grouped["sum"].to_dict()
+        self._sizes = grouped["size"].to_dict()
+        self._state = {"edited_rows": {}, "added_rows": [], "deleted_rows": set()}
+
+    # -- lignes effectives -------------------------------------------------
+    def _base_row(self, pos, state):
+        if pos in state["deleted_rows"]:
+            return None
+        code = self._category_codes[pos]
+        categorie = self._category_names[code] if code >= 0 else np.nan
+        date, valeur = pd.Timestamp(self._dates[pos]), self._values[pos]
+        changes = state["edited_rows"].get(pos, {})
+        if "categorie" in changes:
+            categorie = changes["categorie"]
+        if "date" in changes:
+            date = parse_date_value(changes["date"])
+        if "valeur" in changes:
+            valeur = parse_number_value(changes["valeur"])
+        return categorie, date, valeur
+
+    @staticmethod
+    def _added_row(row):
+        if row is None:
+            return None
+        return row.get("categorie"), parse_date_value(row.get("date")), parse_number_value(row.get("valeur"))
+
+    def _add(self, row, sign):
+        if row is None:
+            return
+        categorie, date, valeur = row
+        if pd.isna(categorie) or pd.isna(date):
+            return
+        key = (categorie, date)
+        delta = sign * (0.0 if np.isnan(valeur) else valeur)
+        self._sums[key] = self._sums.get(key, 0.0) + delta
+        if self._on_delta is not None and delta:
+            self._on_delta(categorie, date, delta)
+        self._sizes[key] = self._sizes.get(key, 0) + sign
+        if self._sizes[key] == 0:
+            del self._sums[key], self._sizes[key]
+
+    # -- API -----------------------------------------------------------------
+    def apply(self, editor_state):
+        """Intègre le nouvel état du data_editor ; ne traite que le delta."""
+        editor_state = editor_state or {}
+        new = {
+            "edited_rows": {int(k): dict(v) for k, v in editor_state.get("edited_rows", {}).items()},
+            "added_rows": [dict(r) if r is not None else None for r in editor_state.get("added_rows", [])],
+            "deleted_rows": {int(p) for p in editor_state.get("deleted_rows", [])},
+        }
+        old = self._state
+
+        changed = {p for p in old["edited_rows"].keys() | new["edited_rows"].keys()
+                   if old["edited_rows"].get(p) != new["edited_rows"].get(p)}
+        changed |= old["deleted_rows"] ^ new["deleted_rows"]
+        for pos in changed:
+            self._add(self._base_row(pos, old), -1)
+            self._add(self._base_row(pos, new), +1)
+
+        n_added = max(len(old["added_rows"]), len(new["added_rows"]))
+        for i in range(n_added):
+            before = old["added_rows"][i] if i < len(old["added_rows"]) else None
+            after = new["added_rows"][i] if i < len(new["added_rows"]) else None
+            if before != after:
+                self._add(self._added_row(before), -1)
+                self._add(self._added_row(after), +1)
+
+        self._state = new
+        return self
+
+    def totals(self, categorie):
+        """Sommes par date pour une catégorie : DataFrame (date, valeur) trié par date."""
+        items = sorted((date, total) for (cat, date), total in self._sums.items() if cat == categorie)
+        return pd.DataFrame(items, columns=["date", "valeur"]).astype({"valeur": np.float64})
+
+
+# ------------- Sous-totaux (catégories dérivées) -------------
+# parent -> [(enfant, signe)] ; les enfants absents des clés sont des feuilles
+ROLLUP_TREE = {
+    "Dépenses RH": [
+        ("Rémunérations", 1), ("Charges sociales", 1), ("Ursaff", 1), ("Stages", 1), ("Congés payés", 1),
+    ],
+    "CHARGES récurrentes": [("Dépenses RH", 1), ("Charges d'exploitation", 1), ("Charges financière", 1)],
+    "Résultat": [("Chiffre d'affaires", 1), ("CHARGES récurrentes", -1)],
+}
+
+
+class RollupEngine:
+    """Recalcule les sous-totaux d'un arbre de catégories, mois par mois.
+
+    L'arbre est aplati en une matrice de coefficients (sous-totaux x feuilles),
+    ex. Résultat = CA - Rémunérations - ... ; compute() calcule tous les
+    sous-totaux en un produit matriciel. update_leaf() ne met à jour que les
+    ancêtres de la feuille modifiée.
+    """
+
+    def __init__(self, tree=ROLLUP_TREE):
+        self.subtotals = list(tree)
+        children = {child for kids in tree.values() for child, _ in kids}
+        self.leaves = sorted(children - set(tree))
+        leaf_pos = {leaf: j for j, leaf in enumerate(self.leaves)}
+
+        def expand(node):
+            if node not in tree:
+                return {node: 1.0}
+            coefs = {}
+            for child, sign in tree[node]:
+                for leaf, c in expand(child).items():
+                    coefs[leaf] = coefs.get(leaf, 0.0) + sign * c
+            return coefs
+
+        self._coefs = np.zeros((len(self.subtotals), len(self.leaves)))
+        self._ancestors = {leaf: [] for leaf in self.leaves}
+        for i, node in enumerate(self.subtotals):
+            for leaf, c in expand(node).items():
+                if c:
+                    self._coefs[i, leaf_pos[leaf]] = c
+                    self._ancestors[leaf].append((i, c))
+        self.dates = pd.DatetimeIndex([])
+        self._values = np.zeros((len(self.subtotals), 0))
+
+    def compute(self, df):
+        """Calcule tous les sous-totaux à partir des feuilles de df (categorie, date, valeur)."""
+        leaves = df[df["categorie"].isin(self.leaves)]
+        wide = (
+            leaves.groupby(["categorie", "date"], observed=True)["valeur"].sum()
+            .unstack("date", fill_value=0.0)
+            .reindex(self.leaves, fill_value=0.0)
+        )
+        self.dates = pd.DatetimeIndex(wide.columns)
+        self._values = self._coefs @ wide.to_numpy(dtype=np.float64)
+        return self
+
+    def update_leaf(self, leaf, date, delta):
+        """Répercute une variation `delta` d'une feuille sur ses seuls ancêtres."""
+        ancestors = self._ancestors.get(leaf)
+        if not ancestors:
+            return
+        # Les colonnes sont des débuts de mois (monthly_totals) : une date saisie en cours
+        # de mois met à jour son mois, pas une nouvelle colonne
+        date = pd.Timestamp(date).to_period("M").to_timestamp()
+        if date not in self.dates:
+            self.dates = self.dates.append(pd.DatetimeIndex([date])).sort_values()
+            self._values = np.insert(self._values, self.dates.get_loc(date), 0.0, axis=1)
+        j = self.dates.get_loc(date)
+        for i, c in ancestors:
+            self._values[i, j] += c * delta
+
+    def frame(self):
+        """Sous-totaux en DataFrame (index = date, une colonne par sous-total)."""
+        return pd.DataFrame(self._values.T, index=self.dates, columns=self.subtotals)
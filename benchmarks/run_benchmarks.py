@@ -0,0 +1,314 @@
+# run_benchmarks.py
+# Mesure les chemins chauds de streamlit_app.py sur des forecasts synthétiques (10^3 à 10^7 lignes).
+#
+#   python benchmarks/run_benchmarks.py                      # tailles 10^3..10^6
+#   python benchmarks/run_benchmarks.py --sizes 1e3 1e7 --only csv_load ca_groupby
+#   python benchmarks/run_benchmarks.py --compare benchmarks/results/<avant>.json
+#
+# Chaque exécution écrit un fichier JSON dans benchmarks/results/ (horodaté, avec le
+# commit git) : on lance avant et après chaque optimisation, puis --compare.
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pyarrow as pa
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aggregation import IncrementalAggregator  # noqa: E402
+from charts import downsample, real_vs_simu_figure  # noqa: E402
+from editing import page_window  # noqa: E402
+from exports import csv_bytes  # noqa: E402
+from forecast_data import CSV_SEP, DATE_FORMAT, category_slices, parse_dates, parse_forecast_csv  # noqa: E402
+from simulation import simulate  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DEFAULT_SIZES = (10**3, 10**4, 10**5, 10**6)
+# Les variantes historiques (apply ligne à ligne, melt + px.line, Styler) deviennent impraticables au-delà,
+# comme la sérialisation d'une figure sans sous-échantillonnage
+LEGACY_MAX_ROWS = {"per_year_override_legacy": 10**5, "figure_json": 10**6, "figure_json_legacy": 10**6,
+                   "styler_format": 10**5}
+
+CATEGORIES = [
+    "Chiffre d'affaires", "Charges d'exploitation", "Rémunérations", "Charges sociales",
+    "Ursaff", "Stages", "Congés payés", "Charges financière",
+]
+
+
+# ------------- Données synthétiques -------------
+def synthetic_forecast(n_rows, seed=0):
+    """Forecast tabulaire (categorie, sous_categorie, valeur, date) de n_rows lignes, dates mensuelles."""
+    rng = np.random.default_rng(seed)
+    months = pd.date_range("2015-01-01", periods=240, freq="MS")
+    return pd.DataFrame({
+        "categorie": pd.Categorical.from_codes(rng.integers(0, len(CATEGORIES), n_rows), CATEGORIES),
+        "sous_categorie": pd.Categorical.from_codes(
+            rng.integers(0, 40, n_rows), [f"Poste {i}" for i in range(40)]
+        ),
+        "valeur": rng.normal(50_000, 20_000, n_rows).round(2),
+        "date": months[rng.integers(0, len(months), n_rows)],
+    })
+
+
+def synthetic_yearly_base(n_rows):
+    """Base annuelle au format de df_base (annee, ca, charges, marge, marge_pct)."""
+    rng = np.random.default_rng(1)
+    ca = rng.uniform(800_000, 1_200_000, n_rows)
+    charges = ca * rng.uniform(0.55, 0.65, n_rows)
+    return pd.DataFrame({
+        "annee": 2000 + np.arange(n_rows) % 50,
+        "ca": ca,
+        "charges": charges,
+        "marge": ca - charges,
+        "marge_pct": (ca - charges) / ca,
+    })
+
+
+def synthetic_dated_series(n_rows):
+    """Série triée par date (date, valeur_k) comme df_ca_sum dans l'app, au pas de la minute."""
+    rng = np.random.default_rng(2)
+    return pd.DataFrame({
+        "date": pd.date_range("2015-01-01", periods=n_rows, freq="min"),
+        "valeur_k": 1_000 + rng.normal(0, 5, n_rows).cumsum(),
+    })
+
+
+# ------------- Cas mesurés -------------
+# Chaque cas reçoit un contexte (dict préparé une fois par taille) et retourne une fonction à chronométrer.
+def case_csv_load(ctx):
+    return lambda: parse_forecast_csv(ctx["csv_path"])
+
+
+def case_date_parse(ctx):
+    return lambda: parse_dates(ctx["date_text"])
+
+
+def case_date_parse_legacy(ctx):
+    return lambda: pd.to_datetime(ctx["date_text"], format=DATE_FORMAT)
+
+
+def case_category_filter(ctx):
+    # Tranches calculées une fois au chargement dans l'app : seul le découpage est mesuré
+    df, rows = ctx["forecast"], ctx["category_slices"]["Chiffre d'affaires"]
+    return lambda: df.iloc[rows]
+
+
+def case_category_filter_legacy(ctx):
+    df = ctx["forecast_unsorted"]
+    return lambda: df[df["categorie"] == "Chiffre d'affaires"].copy()
+
+
+def case_per_year_override(ctx):
+    base, pct = ctx["yearly"], ctx["per_year"]
+    return lambda: simulate(base, 5, -3, pct, pct, composition="override")
+
+
+def case_per_year_override_legacy(ctx):
+    base, pct = ctx["yearly"], ctx["per_year"]
+
+    def run():
+        df = base.copy()
+        df["ca_simu"] = df.apply(lambda r: r["ca"] * (1 + pct.get(r["annee"], 5) / 100), axis=1)
+        df["charges_simu"] = df.apply(lambda r: r["charges"] * (1 + pct.get(r["annee"], -3) / 100), axis=1)
+        df["marge_simu"] = df["ca_simu"] - df["charges_simu"]
+        df["marge_pct_simu"] = df["marge_simu"] / df["ca_simu"]
+        return df
+    return run
+
+
+def case_ca_groupby(ctx):
+    df = ctx["forecast"]
+    return lambda: df.groupby(["categorie", "date"], observed=True)["valeur"].sum()
+
+
+def case_ca_incremental(ctx):
+    # Une édition de cellule sur un agrégateur déjà construit (coût par rerun dans l'app)
+    aggregator = IncrementalAggregator(ctx["forecast"])
+    counter = iter(range(10**9))
+
+    def run():
+        aggregator.apply({"edited_rows": {0: {"valeur": float(next(counter))}}})
+        return aggregator.totals("Chiffre d'affaires")
+    return run
+
+
+def case_figure_json(ctx):
+    # Même entrée que figure_json_legacy : seul le passage melt + px.line -> go.Scatter change
+    df = ctx["simulated"]
+    return lambda: real_vs_simu_figure(df, "ca", "CA").to_json()
+
+
+def case_lttb_downsample(ctx):
+    series = ctx["series"]
+    return lambda: downsample(series, "date", "valeur_k")
+
+
+def case_figure_json_legacy(ctx):
+    df = ctx["simulated"]
+
+    def run():
+        long = df.melt(id_vars="annee", value_vars=["ca", "ca_simu"], var_name="serie", value_name="valeur")
+        return px.line(long, x="annee", y="valeur", color="serie", markers=True).to_json()
+    return run
+
+
+def case_styler_format(ctx):
+    df = ctx["simulated"]
+    formats = {"ca": "{:,.0f}", "charges": "{:,.0f}", "ca_simu": "{:,.0f}", "charges_simu": "{:,.0f}",
+               "marge_pct": "{:.1%}", "marge_pct_simu": "{:.1%}"}
+    return lambda: df.style.format(formats).to_html()
+
+
+def case_table_page(ctx):
+    # Chemin actuel : une page de 1000 lignes sérialisée en Arrow, formats appliqués côté navigateur
+    df = ctx["simulated"]
+
+    def run():
+        table = pa.Table.from_pandas(page_window(df, 1, 1000), preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+    return run
+
+
+def case_csv_export(ctx):
+    df = ctx["simulated"]
+    return lambda: csv_bytes(df)
+
+
+def case_csv_export_legacy(ctx):
+    df = ctx["simulated"]
+    return lambda: df.to_csv(index=False).encode("utf-8")
+
+
+CASES = {
+    "csv_load": case_csv_load,
+    "date_parse": case_date_parse,
+    "date_parse_legacy": case_date_parse_legacy,
+    "category_filter": case_category_filter,
+    "category_filter_legacy": case_category_filter_legacy,
+    "per_year_override": case_per_year_override,
+    "per_year_override_legacy": case_per_year_override_legacy,
+    "ca_groupby": case_ca_groupby,
+    "ca_incremental": case_ca_incremental,
+    "figure_json": case_figure_json,
+    "figure_json_legacy": case_figure_json_legacy,
+    "lttb_downsample": case_lttb_downsample,
+    "styler_format": case_styler_format,
+    "table_page": case_table_page,
+    "csv_export": case_csv_export,
+    "csv_export_legacy": case_csv_export_legacy,
+}
+
+
+def build_context(n_rows, workdir):
+    forecast = synthetic_forecast(n_rows)
+    csv_path = os.path.join(workdir, f"forecast_{n_rows}.csv")
+    forecast.to_csv(csv_path, sep=CSV_SEP, index=False, date_format=DATE_FORMAT)
+    yearly = synthetic_yearly_base(n_rows)
+    per_year = {year: (year % 7) - 3 for year in range(2000, 2050, 2)}
+    sorted_forecast = forecast.iloc[np.argsort(forecast["categorie"].cat.codes.to_numpy(), kind="stable")]
+    return {
+        "csv_path": csv_path,
+        "date_text": forecast["date"].dt.strftime(DATE_FORMAT),
+        "forecast_unsorted": forecast,
+        "forecast": sorted_forecast,
+        "category_slices": category_slices(sorted_forecast),
+        "yearly": yearly,
+        "per_year": per_year,
+        "simulated": simulate(yearly, 5, -3, per_year, per_year),
+        "series": synthetic_dated_series(n_rows),
+    }
+
+
+def time_case(fn, repeats):
+    fn()  # échauffement (caches, imports paresseux)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import plotly
+    import streamlit
+    return {
+        "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {"pandas": pd.__version__, "numpy": np.__version__,
+                     "plotly": plotly.__version__, "streamlit": streamlit.__version__},
+    }
+
+
+def compare(previous_path, results):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {(r["case"], r["rows"]): r["median_s"] for r in json.load(f)["results"]}
+    print(f"\nComparaison avec {previous_path} (ratio > 1 : plus rapide qu'avant)")
+    for r in results:
+        before = previous.get((r["case"], r["rows"]))
+        if before:
+            print(f"  {r['case']:<26} {r['rows']:>10,}  {before:9.4f}s -> {r['median_s']:9.4f}s"
+                  f"  x{before / r['median_s']:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins chauds du simulateur")
+    parser.add_argument("--sizes", nargs="+", type=float, default=DEFAULT_SIZES,
+                        help="nombres de lignes (ex. 1e3 1e7)")
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="cas à exécuter")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="fichier JSON (défaut : benchmarks/results/<horodatage>.json)")
+    parser.add_argument("--compare", help="résultats précédents à comparer")
+    args = parser.parse_args(argv)
+
+    names = args.only or list(CASES)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in sorted(int(s) for s in args.sizes):
+            ctx = build_context(n_rows, workdir)
+            for name in names:
+                if n_rows > LEGACY_MAX_ROWS.get(name, float("inf")):
+                    continue
+                timings = time_case(CASES[name](ctx), args.repeats)
+                results.append({
+                    "case": name, "rows": n_rows, "repeats": args.repeats,
+                    "median_s": statistics.median(timings), "min_s": min(timings), "timings_s": timings,
+                })
+                print(f"{name:<26} {n_rows:>10,}  {results[-1]['median_s']:9.4f}s")
+            del ctx
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, dt.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print(f"\nRésultats : {output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
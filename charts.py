@@ -0,0 +1,120 @@
+# charts.py
+# Préparation des figures Plotly : réduction du nombre de points côté serveur,
+# cache des figures déjà construites.
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Au-delà, la série est sous-échantillonnée (LTTB) avant d'être envoyée au navigateur
+MAX_POINTS_PER_TRACE = 2000
+# Les étiquettes de valeur ne sont affichées que sur les séries courtes
+TEXT_LABEL_MAX_POINTS = 60
+# Nombre de figures gardées en mémoire (LRU, partagé par toutes les sessions du process)
+FIGURE_CACHE_SIZE = 64
+
+_figure_cache = OrderedDict()
+_figure_cache_lock = threading.Lock()
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """Indices retenus par Largest-Triangle-Three-Buckets (premier et dernier points inclus).
+
+    Dans chaque seau, on garde le point qui forme le plus grand triangle avec le
+    point retenu précédemment et la moyenne du seau suivant : pics et creux sont
+    conservés, contrairement à un pas fixe.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = _as_float(x), _as_float(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            next_start, next_stop = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            avg_x, avg_y = x[next_start:next_stop].mean(), y[next_start:next_stop].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        indices[i + 1] = a
+    return indices
+
+
+def downsample(df, x, y, max_points=MAX_POINTS_PER_TRACE):
+    """Retourne df réduit à max_points lignes au plus (LTTB sur les colonnes x, y)."""
+    if len(df) <= max_points:
+        return df
+    return df.iloc[lttb_indices(df[x].to_numpy(), df[y].to_numpy(), max_points)]
+
+
+def real_vs_simu_figure(df, column, title):
+    """Courbes `column` et `column`_simu en fonction de annee, une trace par colonne.
+
+    Les colonnes larges sont passées telles quelles à go.Scatter : pas de melt,
+    donc pas de copie au format long par figure.
+    """
+    x = df["annee"].to_numpy()
+    fig = go.Figure([
+        go.Scatter(x=x, y=df[serie].to_numpy(), name=serie, mode="lines+markers")
+        for serie in (column, f"{column}_simu")
+    ])
+    fig.update_layout(title=title, xaxis_title="Année", yaxis_title="€", legend_title_text="serie")
+    return fig
+
+
+# ------------- Cache de figures -------------
+def frame_digest(data):
+    """Empreinte du contenu d'un DataFrame / Series / tableau NumPy."""
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        hashed = pd.util.hash_pandas_object(data, index=True).to_numpy()
+    else:
+        hashed = np.ascontiguousarray(data)
+    return hashlib.blake2b(hashed.tobytes(), digest_size=16).hexdigest()
+
+
+def _key_part(part):
+    if isinstance(part, (pd.DataFrame, pd.Series, np.ndarray)):
+        return frame_digest(part)
+    if isinstance(part, dict):
+        return tuple(sorted((k, _key_part(v)) for k, v in part.items()))
+    if isinstance(part, (list, tuple)):
+        return tuple(_key_part(p) for p in part)
+    return part
+
+
+def cached_figure(key, build):
+    """Retourne la figure associée à `key`, construite par build() seulement si absente.
+
+    `key` est un tuple (nom du graphique, données, paramètres...) : les DataFrames
+    y sont remplacés par leur empreinte et les dicts par des tuples triés. Une
+    figure dont ni les données ni les paramètres n'ont changé n'est pas
+    reconstruite ; ne pas la modifier après coup, elle est partagée.
+    """
+    key = _key_part(key)
+    with _figure_cache_lock:
+        if key in _figure_cache:
+            _figure_cache.move_to_end(key)
+            return _figure_cache[key]
+    figure = build()
+    with _figure_cache_lock:
+        _figure_cache[key] = figure
+        while len(_figure_cache) > FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+    return figure
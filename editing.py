@@ -0,0 +1,140 @@
+# editing.py
+# Édition paginée : la table de base reste intacte, les modifications vivent dans un overlay.
+import numpy as np
+import pandas as pd
+
+from aggregation import parse_date_value, parse_number_value
+
+PAGE_SIZES = (100, 500, 1000, 5000)
+TEXT_COLUMNS = ("categorie", "sous_categorie")
+
+
+def _typed(column, value):
+    if column == "date":
+        return parse_date_value(value)
+    if column == "valeur":
+        return parse_number_value(value)
+    return value
+
+
+class EditOverlay:
+    """Modifications d'une session sur une table de base (positions 0..n-1 de la base).
+
+    Les lignes sont repérées par un identifiant stable : la position dans la
+    base, ou n + k pour la k-ième ligne ajoutée. state() renvoie l'overlay au
+    format de l'état du data_editor (edited_rows / added_rows / deleted_rows),
+    directement consommable par IncrementalAggregator.
+    """
+
+    def __init__(self, n_base):
+        self.n_base = n_base
+        self.edited_rows = {}
+        self.added_rows = []  # None = ligne ajoutée puis supprimée (les identifiants restent stables)
+        self.deleted_rows = set()
+        # Incrémenté à chaque modification : materialize() ne recalcule qu'après une édition
+        self.revision = 0
+        self._materialized = None
+
+    @classmethod
+    def from_state(cls, n_base, state):
+        """Overlay reconstruit à partir d'un état (ex. delta d'un scénario enregistré)."""
+        overlay = cls(n_base)
+        overlay.edited_rows = {int(pos): dict(changes) for pos, changes in state.get("edited_rows", {}).items()}
+        overlay.added_rows = [dict(row) for row in state.get("added_rows", []) if row is not None]
+        overlay.deleted_rows = {int(pos) for pos in state.get("deleted_rows", [])}
+        return overlay
+
+    def state(self):
+        return {
+            "edited_rows": {pos: dict(changes) for pos, changes in self.edited_rows.items()},
+            "added_rows": [dict(row) if row is not None else None for row in self.added_rows],
+            "deleted_rows": sorted(self.deleted_rows),
+        }
+
+    def apply_editor_state(self, row_ids, editor_state):
+        """Intègre l'état d'un data_editor affichant les lignes `row_ids` (une page)."""
+        for i, changes in editor_state.get("edited_rows", {}).items():
+            row_id = int(row_ids[int(i)])
+            if row_id < self.n_base:
+                self.edited_rows.setdefault(row_id, {}).update(changes)
+            elif self.added_rows[row_id - self.n_base] is not None:
+                self.added_rows[row_id - self.n_base].update(changes)
+        for i in editor_state.get("deleted_rows", []):
+            row_id = int(row_ids[int(i)])
+            if row_id < self.n_base:
+                self.deleted_rows.add(row_id)
+            else:
+                self.added_rows[row_id - self.n_base] = None
+        self.added_rows.extend(dict(row) for row in editor_state.get("added_rows", []))
+        self.revision += 1
+
+    def materialize(self, base):
+        """Table éditée complète, indexée par identifiant de ligne, mise en cache par révision.
+
+        `base` est la table partagée (lecture seule) dont l'overlay a été créé.
+        Sans modification, elle est renvoyée telle quelle (vue, pas de copie) ;
+        sinon, par copy-on-write, seules les colonnes modifiées sont copiées.
+        Ne pas modifier le résultat en place : il est réutilisé jusqu'à la
+        prochaine édition.
+        """
+        if self._materialized is None or self._materialized[0] != self.revision:
+            self._materialized = (self.revision, self._build(base))
+        return self._materialized[1]
+
+    def _build(self, base):
+        df = base.set_axis(pd.RangeIndex(len(base)), axis=0)
+        if self.edited_rows:
+            cells = {}
+            for pos, changes in self.edited_rows.items():
+                for column, value in changes.items():
+                    cells.setdefault(column, ([], []))
+                    cells[column][0].append(pos)
+                    cells[column][1].append(_typed(column, value))
+            for column, (positions, values) in cells.items():
+                if column not in df.columns:
+                    continue
+                if isinstance(df[column].dtype, pd.CategoricalDtype):
+                    new = pd.unique(pd.Series(values, dtype=object).dropna())
+                    df[column] = df[column].cat.add_categories(
+                        [v for v in new if v not in df[column].cat.categories]
+                    )
+                df.iloc[np.asarray(positions), df.columns.get_loc(column)] = values
+        if self.deleted_rows:
+            df = df.drop(index=sorted(self.deleted_rows))
+        added = {
+            self.n_base + k: {col: _typed(col, row.get(col)) for col in df.columns}
+            for k, row in enumerate(self.added_rows) if row is not None
+        }
+        if added:
+            extra = pd.DataFrame.from_dict(added, orient="index", columns=df.columns).astype(
+                {"valeur": df["valeur"].dtype, "date": df["date"].dtype}
+            )
+            df = pd.concat([df.astype({c: object for c in TEXT_COLUMNS if c in df.columns}), extra])
+        return df
+
+
+def search_and_sort(frame, search="", sort_by=None, ascending=True):
+    """Filtre et trie `frame` côté serveur, avant découpage en pages.
+
+    La recherche porte sur les colonnes texte (sans tenir compte de la casse).
+    """
+    view = frame
+    if search:
+        mask = np.zeros(len(view), dtype=bool)
+        for column in TEXT_COLUMNS:
+            if column in view.columns:
+                mask |= view[column].astype(str).str.contains(search, case=False, regex=False).to_numpy()
+        view = view[mask]
+    if sort_by:
+        view = view.sort_values(sort_by, ascending=ascending, kind="stable")
+    return view
+
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
+
+
+def page_window(view, page, page_size):
+    """Lignes de la page `page` (à partir de 1)."""
+    start = (page - 1) * page_size
+    return view.iloc[start:start + page_size]
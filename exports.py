@@ -0,0 +1,172 @@
+# exports.py
+# Exports de scénarios : générés au clic seulement, écrits par blocs, mis en cache par contenu.
+#
+# Formats : CSV, CSV compressé (gzip ; zstd si zstandard est installé), Parquet, et XLSX
+# avec une feuille par catégorie (si xlsxwriter est installé).
+import gzip
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from charts import frame_digest
+
+try:
+    import zstandard
+except ImportError:  # dépendance optionnelle
+    zstandard = None
+
+try:
+    import xlsxwriter
+except ImportError:  # dépendance optionnelle
+    xlsxwriter = None
+
+EXPORT_CHUNK_ROWS = 50_000
+# Exports gardés en mémoire (partagés par toutes les sessions du process)
+EXPORT_CACHE_SIZE = 16
+
+# format -> (libellé, extension, type MIME)
+EXPORT_FORMATS = {
+    "csv": ("CSV", "csv", "text/csv"),
+    "csv.gz": ("CSV compressé (gzip)", "csv.gz", "application/gzip"),
+    "csv.zst": ("CSV compressé (zstd)", "csv.zst", "application/zstd"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+    "xlsx": ("Excel (une feuille par catégorie)", "xlsx",
+             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+XLSX_MAX_ROWS = 1_048_575  # lignes de données par feuille (hors en-tête)
+XLSX_NO_CATEGORY = "(sans catégorie)"
+
+
+def available_formats():
+    """Formats utilisables avec les dépendances installées."""
+    missing = set()
+    if zstandard is None:
+        missing.add("csv.zst")
+    if xlsxwriter is None:
+        missing.add("xlsx")
+    return [fmt for fmt in EXPORT_FORMATS if fmt not in missing]
+
+
+def format_label(fmt):
+    return EXPORT_FORMATS[fmt][0]
+
+
+def export_filename(stem, fmt):
+    return f"{stem}.{EXPORT_FORMATS[fmt][1]}"
+
+
+def export_mime(fmt):
+    return EXPORT_FORMATS[fmt][2]
+
+
+# ------------- Écrivains -------------
+def write_csv(df, stream, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Écrit df en CSV UTF-8 dans stream, bloc par bloc.
+
+    Seul un bloc de chunk_rows lignes existe à la fois sous forme de texte :
+    pas de chaîne CSV complète, ni de copie encodée de cette chaîne.
+    """
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        stream.write(chunk.to_csv(index=False, header=start == 0).encode("utf-8"))
+
+
+def write_parquet(df, stream, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Parquet typé (compression zstd), un row group par bloc de chunk_rows lignes."""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(stream, schema, compression="zstd") as writer:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _sheet_name(name, used):
+    """Nom de feuille Excel valide (31 caractères, sans []:*?/\\) et unique."""
+    base = "".join("_" if c in "[]:*?/\\" else c for c in str(name))[:31] or "Feuille"
+    candidate, n = base, 1
+    while candidate.lower() in used:
+        n += 1
+        candidate = f"{base[:31 - len(str(n)) - 1]}_{n}"
+    used.add(candidate.lower())
+    return candidate
+
+
+def _xlsx_sheets(df, sheet_by):
+    """(nom, lignes) de chaque feuille : un groupe par valeur de sheet_by (valeurs manquantes
+    comprises), découpé en feuilles de suite « nom (2) », « nom (3) »... au-delà de XLSX_MAX_ROWS."""
+    if sheet_by in df.columns and len(df):
+        groups = df.groupby(sheet_by, observed=True, sort=False, dropna=False)
+    else:
+        groups = [("scenario", df)]
+    for name, part in groups:
+        label = XLSX_NO_CATEGORY if name != name else str(name)  # NaN != NaN
+        for n, start in enumerate(range(0, max(len(part), 1), XLSX_MAX_ROWS), start=1):
+            suffix = f" ({n})" if n > 1 else ""
+            yield label[:31 - len(suffix)] + suffix, part.iloc[start:start + XLSX_MAX_ROWS]
+
+
+def write_xlsx(df, stream, sheet_by="categorie"):
+    """Classeur XLSX, une feuille par valeur de sheet_by (une seule feuille si la colonne manque).
+
+    xlsxwriter en mode constant_memory : chaque ligne est écrite sur disque dès
+    qu'elle est complète, les feuilles sont donc remplies l'une après l'autre.
+    """
+    workbook = xlsxwriter.Workbook(stream, {"constant_memory": True, "default_date_format": "dd/mm/yyyy"})
+    used = set()
+    for name, part in _xlsx_sheets(df, sheet_by):
+        sheet = workbook.add_worksheet(_sheet_name(name, used))
+        sheet.write_row(0, 0, [str(c) for c in part.columns])
+        for start in range(0, len(part), EXPORT_CHUNK_ROWS):
+            chunk = part.iloc[start:start + EXPORT_CHUNK_ROWS].astype(object)
+            chunk = chunk.where(chunk.notna(), None)
+            for i, row in enumerate(chunk.itertuples(index=False, name=None), start=start + 1):
+                sheet.write_row(i, 0, row)
+    workbook.close()
+
+
+def write_export(df, fmt, stream):
+    if fmt == "csv":
+        write_csv(df, stream)
+    elif fmt == "csv.gz":
+        with gzip.GzipFile(fileobj=stream, mode="wb", compresslevel=6) as compressed:
+            write_csv(df, compressed)
+    elif fmt == "csv.zst":
+        with zstandard.ZstdCompressor(level=3).stream_writer(stream, closefd=False) as compressed:
+            write_csv(df, compressed)
+    elif fmt == "parquet":
+        write_parquet(df, stream)
+    elif fmt == "xlsx":
+        write_xlsx(df, stream)
+    else:
+        raise ValueError(f"format d'export inconnu : {fmt!r}")
+
+
+def export_bytes(df, fmt="csv"):
+    buffer = io.BytesIO()
+    write_export(df, fmt, buffer)
+    return buffer.getvalue()
+
+
+def csv_bytes(df):
+    return export_bytes(df, "csv")
+
+
+# ------------- Génération au clic -------------
+def export_key(df):
+    """Empreinte d'un scénario : contenu et noms de colonnes."""
+    return frame_digest(df), tuple(df.columns)
+
+
+@st.cache_resource(max_entries=EXPORT_CACHE_SIZE, show_spinner=False)
+def _cached_export(key, fmt, _df):
+    return export_bytes(_df, fmt)
+
+
+def lazy_export(df, fmt="csv"):
+    """Callable pour st.download_button(data=...) : le fichier n'est produit qu'au clic.
+
+    Un scénario inchangé (même empreinte, même format) réutilise les octets déjà générés.
+    """
+    return lambda: _cached_export(export_key(df), fmt, df)
@@ -0,0 +1,274 @@
+# forecast_data.py
+# Chargement du forecast tabulaire (bp_forecast_tabulaire.csv) avec cache.
+import glob
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import streamlit as st
+
+FORECAST_CSV = "bp_forecast_tabulaire.csv"
+CSV_SEP = ";"
+DATE_FORMAT = "%d/%m/%Y"
+# Dossier des copies colonnaires (Arrow IPC) à côté du CSV
+SIDECAR_DIR = ".forecast_cache"
+# À incrémenter quand la forme du DataFrame chargé change (invalide les copies existantes)
+SIDECAR_VERSION = 2
+# Au-delà de cette taille, le CSV est ingéré en flux (voir ingest_forecast_stream)
+STREAMING_THRESHOLD_BYTES = int(os.environ.get("BP_STREAMING_THRESHOLD_MB", "512")) * 1024 * 1024
+STREAMING_CHUNK_ROWS = 250_000
+
+# Dernière signature vue par fichier, pour évincer l'entrée périmée du cache
+_last_signatures = {}
+
+
+def file_signature(path):
+    """Signature (chemin absolu, mtime en ns, taille) qui identifie une version du fichier."""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def parse_dates(values, date_format=DATE_FORMAT):
+    """Convertit des dates texte en datetime64 en analysant chaque valeur distincte une seule fois.
+
+    Un forecast mensuel ne contient que quelques dizaines de dates distinctes :
+    on factorise (codes entiers + table des valeurs uniques), on analyse la table,
+    puis on redistribue par les codes. Valeurs invalides ou manquantes -> NaT.
+    """
+    if not isinstance(values, pd.Series):
+        values = pd.Series(np.asarray(values, dtype=object))
+    codes, uniques = pd.factorize(values)
+    lookup = pd.to_datetime(pd.Index(uniques, dtype=object), format=date_format, errors="coerce")
+    return pd.Series(
+        lookup.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index, name=values.name
+    )
+
+
+def parse_forecast_csv(path):
+    """Lit le CSV du forecast avec des types explicites.
+
+    categorie / sous_categorie -> category (ordre d'apparition conservé),
+    valeur -> float64, date -> datetime64. Les valeurs non numériques (ex. "primes")
+    deviennent NaN, comme le faisait pd.to_numeric(errors="coerce") après édition.
+
+    Les lignes sont regroupées par catégorie (tri stable, l'ordre du fichier est
+    conservé dans chaque catégorie, l'index d'origine aussi) : chaque catégorie
+    occupe une plage contiguë, voir category_slices.
+    """
+    df = pd.read_csv(path, sep=CSV_SEP, dtype=str)
+    df["valeur"] = pd.to_numeric(df["valeur"], errors="coerce").astype(np.float64)
+    for col in ("categorie", "sous_categorie"):
+        df[col] = pd.Categorical(df[col], categories=pd.unique(df[col].dropna()))
+    df["date"] = parse_dates(df["date"])
+    return df.iloc[np.argsort(df["categorie"].cat.codes.to_numpy(), kind="stable")]
+
+
+def category_slices(df):
+    """Index {catégorie: slice} d'un DataFrame regroupé par catégorie.
+
+    df.iloc[slice] est une vue (copy-on-write) : changer de catégorie ne copie rien.
+    """
+    codes = df["categorie"].cat.codes.to_numpy()
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+    stops = np.append(starts[1:], len(codes))
+    categories = df["categorie"].cat.categories
+    return {categories[codes[a]]: slice(int(a), int(b)) for a, b in zip(starts, stops) if codes[a] >= 0}
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Empreinte blake2b du contenu du fichier (invalide la copie colonnaire)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def sidecar_path(path, digest):
+    folder = os.path.join(os.path.dirname(os.path.abspath(path)), SIDECAR_DIR)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(folder, f"{stem}-v{SIDECAR_VERSION}-{digest}.arrow")
+
+
+def load_forecast_columnar(path):
+    """Charge le forecast via sa copie Arrow IPC, créée au premier chargement du CSV.
+
+    La copie est écrite non compressée pour pouvoir être mappée en mémoire
+    (memory_map) sans décodage aux démarrages suivants. Elle est nommée d'après
+    l'empreinte du contenu du CSV : toute modification du CSV la rend obsolète.
+    """
+    target = sidecar_path(path, file_digest(path))
+    if os.path.exists(target):
+        try:
+            return feather.read_table(target, memory_map=True).to_pandas(split_blocks=True)
+        except (OSError, ValueError):
+            pass  # copie corrompue ou illisible : on repart du CSV
+    df = parse_forecast_csv(path)
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Supprimer les copies des versions précédentes du même fichier
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for old in glob.glob(os.path.join(os.path.dirname(target), glob.escape(stem) + "-*.arrow")):
+            os.remove(old)
+        tmp = target + ".tmp"
+        feather.write_feather(df, tmp, compression="uncompressed")
+        os.replace(tmp, target)
+    except OSError:
+        pass  # dossier en lecture seule : on travaille sans copie colonnaire
+    return df
+
+
+# ------------- Ingestion en flux (fichiers plus gros que la mémoire) -------------
+SPILL_SCHEMA = pa.schema([
+    ("categorie", pa.string()),
+    ("sous_categorie", pa.string()),
+    ("valeur", pa.float64()),
+    ("date", pa.timestamp("us")),
+])
+
+
+@dataclass(frozen=True)
+class StreamedForecast:
+    """Forecast ingéré en flux : agrégats en mémoire, lignes brutes sur disque.
+
+    totals : somme et nombre de lignes par (categorie, date) ;
+    rows_path : fichier Parquet des lignes brutes, relu catégorie par catégorie.
+    """
+    rows_path: str
+    totals: pd.DataFrame
+
+    @property
+    def categories(self):
+        return list(pd.unique(self.totals["categorie"]))
+
+    def category_rows(self, categorie):
+        """Lignes d'une catégorie, relues depuis le Parquet (filtre sur la colonne categorie)."""
+        table = pq.read_table(self.rows_path, filters=[("categorie", "==", categorie)])
+        return table.to_pandas().astype({"categorie": "category", "sous_categorie": "category"})
+
+
+def _typed_chunk(chunk):
+    chunk["valeur"] = pd.to_numeric(chunk["valeur"], errors="coerce").astype(np.float64)
+    chunk["date"] = parse_dates(chunk["date"])
+    return chunk
+
+
+def _temp_spill_folder(path):
+    """Repli dans le dossier temporaire, un sous-dossier par dossier du CSV (pas de collision de noms)."""
+    key = hashlib.sha1(os.path.dirname(os.path.abspath(path)).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), SIDECAR_DIR, key)
+
+
+def _spill_paths(folder, name):
+    return os.path.join(folder, name + "-rows.parquet"), os.path.join(folder, name + "-totals.parquet")
+
+
+def _writable_folder(folders):
+    """Premier dossier créable et inscriptible (ex. dossier de déploiement en lecture seule)."""
+    for folder in folders[:-1]:
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(folder, os.W_OK):
+            return folder
+    os.makedirs(folders[-1], exist_ok=True)
+    return folders[-1]
+
+
+def ingest_forecast_stream(path, chunk_rows=STREAMING_CHUNK_ROWS):
+    """Lit le CSV par blocs de chunk_rows lignes, sans jamais le charger en entier.
+
+    Chaque bloc est typé (dates analysées bloc par bloc), ajouté au fichier
+    Parquet des lignes brutes (un row group par bloc) et réduit en sommes par
+    (categorie, date). Seuls ces agrégats restent en mémoire. Les fichiers
+    produits sont nommés d'après l'empreinte du CSV et réutilisés tant qu'il
+    ne change pas ; ils vont dans le dossier temporaire si celui du CSV est en
+    lecture seule.
+    """
+    sidecar = sidecar_path(path, file_digest(path))
+    name = os.path.basename(sidecar)[: -len(".arrow")]
+    folders = [os.path.dirname(sidecar), _temp_spill_folder(path)]
+    for folder in folders:
+        rows_path, totals_path = _spill_paths(folder, name)
+        if os.path.exists(rows_path) and os.path.exists(totals_path):
+            return StreamedForecast(rows_path, pd.read_parquet(totals_path))
+
+    folder = _writable_folder(folders)
+    rows_path, totals_path = _spill_paths(folder, name)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for old in glob.glob(os.path.join(folder, glob.escape(stem) + "-*.parquet")):
+        os.remove(old)
+
+    partials = []
+    with pq.ParquetWriter(rows_path + ".tmp", SPILL_SCHEMA) as writer:
+        for chunk in pd.read_csv(path, sep=CSV_SEP, dtype=str, chunksize=chunk_rows):
+            chunk = _typed_chunk(chunk)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=SPILL_SCHEMA, preserve_index=False))
+            partials.append(
+                chunk.groupby(["categorie", "date"], sort=False)["valeur"].agg(["sum", "size"])
+            )
+    totals = (
+        pd.concat(partials).groupby(level=["categorie", "date"], sort=False).sum()
+        .rename(columns={"sum": "valeur", "size": "lignes"})
+        .reset_index()
+    )
+    totals.to_parquet(totals_path + ".tmp", index=False)
+    os.replace(rows_path + ".tmp", rows_path)
+    os.replace(totals_path + ".tmp", totals_path)
+    return StreamedForecast(rows_path, totals)
+
+
+def is_large_forecast(path):
+    """Vrai si le fichier doit être ingéré en flux plutôt que chargé en mémoire."""
+    return os.path.getsize(path) > STREAMING_THRESHOLD_BYTES
+
+
+# cache_resource : un seul DataFrame par version de fichier et par process,
+# partagé entre les reruns (et les sessions) — ne jamais le modifier en place.
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _load_forecast_cached(path, mtime_ns, size):
+    return load_forecast_columnar(path)
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _category_index_cached(path, mtime_ns, size):
+    return category_slices(_load_forecast_cached(path, mtime_ns, size))
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _forecast_stream_cached(path, mtime_ns, size):
+    return ingest_forecast_stream(path)
+
+
+def _current_signature(path):
+    signature = file_signature(path)
+    previous = _last_signatures.get(signature[0])
+    if previous is not None and previous != signature:
+        # Le fichier a changé : on évince l'ancienne version des caches
+        _load_forecast_cached.clear(*previous)
+        _category_index_cached.clear(*previous)
+        _forecast_stream_cached.clear(*previous)
+    _last_signatures[signature[0]] = signature
+    return signature
+
+
+def load_forecast(path=FORECAST_CSV):
+    """Retourne le forecast typé, re-parsé uniquement si le fichier a changé (mtime ou taille)."""
+    return _load_forecast_cached(*_current_signature(path))
+
+
+def load_category_index(path=FORECAST_CSV):
+    """Index {catégorie: slice} du forecast chargé par load_forecast, calculé une fois par version."""
+    return _category_index_cached(*_current_signature(path))
+
+
+def load_forecast_stream(path=FORECAST_CSV):
+    """Forecast ingéré en flux (agrégats + lignes sur disque), recalculé si le fichier change."""
+    return _forecast_stream_cached(*_current_signature(path))
@@ -0,0 +1,133 @@
+# profiling.py
+# Instrumentation optionnelle d'un rerun : temps par section, et trace cProfile / pyinstrument.
+#
+# Activation : paramètre d'URL ?profile=1 (ou ?profile=cprofile / ?profile=pyinstrument pour
+# enregistrer aussi une trace), ou variable d'environnement BP_PROFILE avec les mêmes valeurs.
+import cProfile
+import datetime as dt
+import functools
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+import streamlit as st
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # dépendance optionnelle
+    PyinstrumentProfiler = None
+
+PROFILE_DIR = os.environ.get("BP_PROFILE_DIR", ".profiles")
+TRACE_MODES = ("cprofile", "pyinstrument")
+
+
+class RerunProfiler:
+    """Chronomètre les sections d'un rerun ; inactif (coût nul) si mode est None.
+
+    Une section peut être traversée plusieurs fois (ex. deux figures) : les
+    durées s'additionnent. finish() affiche le détail dans la barre latérale et
+    écrit la trace éventuelle dans PROFILE_DIR.
+    """
+
+    def __init__(self, mode=None, fragment=None):
+        self.mode = mode
+        # Nom du fragment si ce profileur ne chronomètre que le rerun d'un st.fragment
+        self.fragment_name = fragment
+        self.timings = {}
+        self._start = time.perf_counter()
+        self._finished = False
+        self._fragment_run = None
+        self._tracer = None
+        if mode == "cprofile":
+            self._tracer = cProfile.Profile()
+            self._tracer.enable()
+        elif mode == "pyinstrument" and PyinstrumentProfiler is not None:
+            self._tracer = PyinstrumentProfiler()
+            self._tracer.start()
+
+    @classmethod
+    def from_request(cls):
+        """Mode demandé par ?profile=... ou BP_PROFILE ("1" : temps seuls)."""
+        value = st.query_params.get("profile") or os.environ.get("BP_PROFILE")
+        if not value or value in ("0", "false"):
+            return cls(None)
+        return cls(value if value in TRACE_MODES else "timings")
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def section(self, name):
+        if not self.enabled:
+            return nullcontext()
+        if self._fragment_run is not None:
+            return self._fragment_run.section(name)
+        return self._timed(name)
+
+    def fragment(self, func):
+        """Décorateur à placer sous @st.fragment.
+
+        Pendant un rerun complet, le fragment compte dans ce rerun. Quand le
+        fragment est seul à se réexécuter, ce profileur est déjà terminé : ses
+        sections sont alors chronométrées par un profileur propre à ce rerun du
+        fragment, affiché à la fin du fragment (un fragment ne peut pas écrire
+        dans la barre latérale).
+        """
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            if not self.enabled or not self._finished:
+                return func(*args, **kwargs)
+            self._fragment_run = RerunProfiler(self.mode, fragment=func.__name__)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                fragment_run, self._fragment_run = self._fragment_run, None
+                fragment_run.finish()
+        return run
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def _dump_trace(self):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        prefix = f"fragment-{self.fragment_name}-" if self.fragment_name else "rerun-"
+        stem = os.path.join(PROFILE_DIR, prefix + dt.datetime.now().strftime("%Y%m%d-%H%M%S-%f"))
+        if self.mode == "cprofile":
+            self._tracer.disable()
+            self._tracer.dump_stats(stem + ".prof")
+            return stem + ".prof"
+        self._tracer.stop()
+        with open(stem + ".html", "w", encoding="utf-8") as f:
+            f.write(self._tracer.output_html())
+        return stem + ".html"
+
+    def finish(self):
+        if not self.enabled or self._finished:
+            return
+        self._finished = True
+        total = time.perf_counter() - self._start
+        trace = self._dump_trace() if self._tracer is not None else None
+        rows = sorted(self.timings.items(), key=lambda item: -item[1])
+        rows.append(("autres", max(total - sum(self.timings.values()), 0.0)))
+        breakdown = pd.DataFrame(rows, columns=["section", "ms"]).assign(ms=lambda d: d["ms"] * 1000)
+        if self.fragment_name:
+            # Conteneur du fragment (éventuellement déjà dans un expander : pas d'expander imbriqué)
+            panel = st.container(border=True)
+            panel.caption(f"⏱️ Fragment {self.fragment_name} : {total * 1000:.0f} ms")
+        else:
+            panel = st.sidebar.expander(f"⏱️ Rerun : {total * 1000:.0f} ms", expanded=True)
+        with panel:
+            st.dataframe(
+                breakdown, hide_index=True, width="stretch",
+                column_config={"ms": st.column_config.NumberColumn("ms", format="%.1f")},
+            )
+            if trace:
+                st.caption(f"Trace : `{trace}`")
+            elif self.mode == "pyinstrument":
+                st.caption("pyinstrument n'est pas installé : temps par section seulement.")
@@ -0,0 +1,154 @@
+# scenarios.py
+# Scénarios enregistrés dans une base SQLite locale : paramètres + delta des cellules éditées.
+#
+# Un scénario ne stocke jamais la table complète : seulement ses paramètres (JSON) et,
+# pour un scénario d'édition, les cellules modifiées / lignes ajoutées / lignes
+# supprimées par rapport à la version de la base (identifiants de ligne de l'EditOverlay).
+import datetime as dt
+import json
+import os
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass, field
+
+import pandas as pd
+import streamlit as st
+
+SCENARIO_DB = os.environ.get("BP_SCENARIO_DB", "scenarios.db")
+KINDS = ("simulation", "edition")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    params TEXT NOT NULL,
+    base_version TEXT,
+    base_rows INTEGER,
+    UNIQUE (kind, name)
+);
+CREATE TABLE IF NOT EXISTS scenario_deltas (
+    scenario_id INTEGER NOT NULL REFERENCES scenarios (id) ON DELETE CASCADE,
+    op TEXT NOT NULL,          -- 'edit' (cellules), 'add' (ligne ajoutée), 'delete'
+    row_id INTEGER NOT NULL,
+    payload TEXT               -- JSON {colonne: valeur} pour 'edit' et 'add'
+);
+CREATE INDEX IF NOT EXISTS idx_scenario_deltas ON scenario_deltas (scenario_id);
+"""
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Scénario relu depuis le store.
+
+    delta : état au format EditOverlay.state() (edited_rows / added_rows /
+    deleted_rows), vide pour un scénario de simulation.
+    """
+    id: int
+    name: str
+    kind: str
+    params: dict
+    base_version: object = None
+    base_rows: int = None
+    delta: dict = field(default_factory=dict)
+
+    def matches_version(self, version):
+        """Vrai si le scénario a été enregistré sur cette version des données."""
+        return self.base_version == json.loads(_to_json(version))
+
+
+def _to_json(value):
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+class ScenarioStore:
+    """Dépôt SQLite des scénarios ; une connexion par opération (sûr entre sessions / threads)."""
+
+    def __init__(self, path=SCENARIO_DB):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return closing(conn)
+
+    def save(self, name, kind, params, base_version=None, delta=None, base_rows=None):
+        """Enregistre (ou remplace, même nom et même type) un scénario ; retourne son id."""
+        if kind not in KINDS:
+            raise ValueError(f"type de scénario inconnu : {kind!r}")
+        delta = delta or {}
+        rows = [("edit", int(pos), _to_json(changes)) for pos, changes in delta.get("edited_rows", {}).items()]
+        rows += [("add", k, _to_json(row)) for k, row in enumerate(delta.get("added_rows", [])) if row is not None]
+        rows += [("delete", int(pos), None) for pos in delta.get("deleted_rows", [])]
+        with self._connect() as conn, conn:
+            conn.execute("DELETE FROM scenarios WHERE kind = ? AND name = ?", (kind, name))
+            cursor = conn.execute(
+                "INSERT INTO scenarios (name, kind, created_at, params, base_version, base_rows) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, kind, dt.datetime.now().isoformat(timespec="seconds"), _to_json(params),
+                 None if base_version is None else _to_json(base_version), base_rows),
+            )
+            scenario_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO scenario_deltas (scenario_id, op, row_id, payload) VALUES (?, ?, ?, ?)",
+                [(scenario_id, *row) for row in rows],
+            )
+        return scenario_id
+
+    def list(self, kind=None):
+        """Scénarios enregistrés (id, name, kind, created_at, changes), du plus récent au plus ancien."""
+        where, params = ("WHERE s.kind = ? ", (kind,)) if kind else ("", ())
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                "SELECT s.id, s.name, s.kind, s.created_at, COUNT(d.scenario_id) AS changes "
+                f"FROM scenarios s LEFT JOIN scenario_deltas d ON d.scenario_id = s.id {where}"
+                "GROUP BY s.id ORDER BY s.created_at DESC, s.id DESC",
+                conn, params=params,
+            )
+
+    def load(self, scenario_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, name, kind, params, base_version, base_rows FROM scenarios WHERE id = ?",
+                (scenario_id,),
+            ).fetchone()
+            if row is None:
+                raise KeyError(scenario_id)
+            deltas = conn.execute(
+                "SELECT op, row_id, payload FROM scenario_deltas WHERE scenario_id = ? ORDER BY op, row_id",
+                (scenario_id,),
+            ).fetchall()
+        delta = {"edited_rows": {}, "added_rows": [], "deleted_rows": []}
+        for op, row_id, payload in deltas:
+            if op == "edit":
+                delta["edited_rows"][row_id] = json.loads(payload)
+            elif op == "add":
+                delta["added_rows"].append(json.loads(payload))
+            else:
+                delta["deleted_rows"].append(row_id)
+        base_version = row[4] if row[4] is None else json.loads(row[4])
+        return Scenario(row[0], row[1], row[2], json.loads(row[3]), base_version, row[5], delta)
+
+    def load_params(self, scenario_ids):
+        """Paramètres de plusieurs scénarios en une requête : {id: params}."""
+        ids = [int(i) for i in scenario_ids]
+        if not ids:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, params FROM scenarios WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall()
+        return {scenario_id: json.loads(params) for scenario_id, params in rows}
+
+    def delete(self, scenario_id):
+        with self._connect() as conn, conn:
+            conn.execute("DELETE FROM scenarios WHERE id = ?", (scenario_id,))
+
+
+@st.cache_resource(show_spinner=False)
+def get_store(path=SCENARIO_DB):
+    """Store partagé par toutes les sessions (schéma créé au premier appel)."""
+    return ScenarioStore(path)
@@ -0,0 +1,283 @@
+# simulation.py
+# Moteur de scénarios : applique les variations de CA / charges sur une base annuelle.
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Règles de combinaison entre la variation globale et les variations par année :
+#   "override" : la variation de l'année remplace la variation globale
+#                (les années absentes du dict gardent la variation globale) ;
+#   "multiply" : les deux s'enchaînent, facteur = (1 + global) * (1 + année).
+COMPOSITIONS = {
+    "override": "Par année remplace le global",
+    "multiply": "Global puis par année (cumulés)",
+}
+
+
+def year_percentages(years, pct_by_year):
+    """Aligne un dict {année: %} sur le tableau `years` ; NaN pour les années absentes du dict.
+
+    Recherche vectorisée (searchsorted) : aucun passage Python par ligne.
+    """
+    years = np.asarray(years, dtype=np.int64)
+    pct = np.full(years.shape, np.nan)
+    if pct_by_year:
+        keys = np.fromiter((int(k) for k in pct_by_year.keys()), dtype=np.int64, count=len(pct_by_year))
+        values = np.fromiter(pct_by_year.values(), dtype=np.float64, count=len(pct_by_year))
+        order = np.argsort(keys)
+        keys, values = keys[order], values[order]
+        pos = np.minimum(np.searchsorted(keys, years), len(keys) - 1)
+        found = keys[pos] == years
+        pct[found] = values[pos[found]]
+    return pct
+
+
+def year_multipliers(years, pct_by_year, default_pct=0.0):
+    """Facteurs 1 + %/100 par ligne ; les années absentes du dict prennent `default_pct`."""
+    pct = year_percentages(years, pct_by_year)
+    return 1.0 + np.where(np.isnan(pct), float(default_pct), pct) / 100.0
+
+
+def scenario_factors(years, global_ca_pct, global_charges_pct,
+                     per_year_ca=None, per_year_charges=None, composition="override"):
+    """Facteurs (n, 2) à appliquer aux colonnes [ca, charges] pour chaque ligne."""
+    if composition not in COMPOSITIONS:
+        raise ValueError(f"composition inconnue : {composition!r}")
+    global_pct = (global_ca_pct, global_charges_pct)
+    per_year = (per_year_ca, per_year_charges)
+    factors = np.empty((len(years), 2))
+    for j in range(2):
+        if not per_year[j]:
+            factors[:, j] = 1.0 + global_pct[j] / 100.0
+        elif composition == "override":
+            factors[:, j] = year_multipliers(years, per_year[j], default_pct=global_pct[j])
+        else:
+            factors[:, j] = (1.0 + global_pct[j] / 100.0) * year_multipliers(years, per_year[j])
+    return factors
+
+
+SIMU_COLUMNS = ("ca_simu", "charges_simu", "marge_simu", "marge_pct_simu")
+
+
+def simulate(df_base, global_ca_pct=0, global_charges_pct=0,
+             per_year_ca=None, per_year_charges=None, composition="override", out=None):
+    """Retourne df_base enrichi des colonnes *_simu (ca, charges, marge, marge_pct).
+
+    df_base doit contenir les colonnes annee, ca et charges. Les colonnes de
+    df_base sont reprises sans copie (copy-on-write) et les quatre colonnes
+    simulées sont écrites dans un seul tableau (n, 4) : `out` si fourni
+    (tampon réutilisable), sinon alloué ici.
+    """
+    factors = scenario_factors(
+        df_base["annee"].to_numpy(), global_ca_pct, global_charges_pct,
+        per_year_ca, per_year_charges, composition,
+    )
+    if out is None:
+        out = np.empty((len(df_base), len(SIMU_COLUMNS)))
+    np.multiply(df_base["ca"].to_numpy(dtype=np.float64), factors[:, 0], out=out[:, 0])
+    np.multiply(df_base["charges"].to_numpy(dtype=np.float64), factors[:, 1], out=out[:, 1])
+    np.subtract(out[:, 0], out[:, 1], out=out[:, 2])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(out[:, 2], out[:, 0], out=out[:, 3])
+
+    columns = {col: df_base[col] for col in df_base.columns}
+    columns.update({col: out[:, j] for j, col in enumerate(SIMU_COLUMNS)})
+    return pd.DataFrame(columns, index=df_base.index, copy=False)
+
+
+# ------------- Balayage (grille de scénarios) -------------
+SWEEP_METRICS = ("ca_simu", "charges_simu", "marge_simu", "marge_pct_simu")
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    """Résultat d'un balayage : cube (scénario x année x métrique).
+
+    Le scénario s correspond à ca_pcts[s // len(charges_pcts)] et
+    charges_pcts[s % len(charges_pcts)].
+    """
+    ca_pcts: np.ndarray
+    charges_pcts: np.ndarray
+    years: np.ndarray
+    cube: np.ndarray
+
+    def surface(self, metric, year=None):
+        """Surface (len(ca_pcts), len(charges_pcts)) d'une métrique.
+
+        year=None : cumul sur toutes les années (marge_pct = marge cumulée / CA cumulé).
+        """
+        grid = self.cube.reshape(len(self.ca_pcts), len(self.charges_pcts), len(self.years), -1)
+        if year is not None:
+            idx = int(np.flatnonzero(self.years == year)[0])
+            return grid[:, :, idx, SWEEP_METRICS.index(metric)]
+        if metric == "marge_pct_simu":
+            totals = grid.sum(axis=2)
+            return totals[..., 2] / totals[..., 0]
+        return grid[..., SWEEP_METRICS.index(metric)].sum(axis=2)
+
+
+def sweep_scenarios(df_base, ca_pcts, charges_pcts):
+    """Évalue toutes les combinaisons (variation CA, variation charges) en un seul broadcast.
+
+    Seules les variations globales sont balayées ; les overrides par année ne
+    s'appliquent pas ici.
+    """
+    ca_pcts = np.asarray(ca_pcts, dtype=np.float64)
+    charges_pcts = np.asarray(charges_pcts, dtype=np.float64)
+    ca = df_base["ca"].to_numpy(dtype=np.float64)
+    charges = df_base["charges"].to_numpy(dtype=np.float64)
+
+    # (n_ca, 1, n_annees) et (1, n_charges, n_annees)
+    ca_simu = (1.0 + ca_pcts / 100.0)[:, None, None] * ca[None, None, :]
+    charges_simu = (1.0 + charges_pcts / 100.0)[None, :, None] * charges[None, None, :]
+
+    shape = (len(ca_pcts), len(charges_pcts), len(ca))
+    cube = np.empty(shape + (len(SWEEP_METRICS),))
+    cube[..., 0] = ca_simu
+    cube[..., 1] = charges_simu
+    np.subtract(cube[..., 0], cube[..., 1], out=cube[..., 2])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(cube[..., 2], cube[..., 0], out=cube[..., 3])
+    return SweepResult(
+        ca_pcts=ca_pcts,
+        charges_pcts=charges_pcts,
+        years=df_base["annee"].to_numpy(),
+        cube=cube.reshape(-1, len(ca), len(SWEEP_METRICS)),
+    )
+
+
+# ------------- Comparaison de scénarios -------------
+@dataclass(frozen=True)
+class ComparisonResult:
+    """Cube (scénario x année x métrique) de N scénarios évalués ensemble."""
+    names: list
+    years: np.ndarray
+    cube: np.ndarray
+
+    def series(self, metric):
+        """Une colonne par scénario, une ligne par année."""
+        return pd.DataFrame(self.cube[..., SWEEP_METRICS.index(metric)].T, index=self.years, columns=self.names)
+
+    def ranking(self):
+        """Cumuls par scénario, classés par marge cumulée décroissante."""
+        totals = self.cube.sum(axis=1)
+        table = pd.DataFrame({
+            "scenario": self.names,
+            "ca": totals[:, 0],
+            "charges": totals[:, 1],
+            "marge": totals[:, 2],
+            "marge_pct": totals[:, 2] / totals[:, 0],
+            "marge_derniere_annee": self.cube[:, -1, 2],
+        })
+        table = table.sort_values("marge", ascending=False, kind="stable").reset_index(drop=True)
+        table.insert(0, "rang", np.arange(1, len(table) + 1))
+        return table
+
+
+def scenario_matrix(years, scenarios):
+    """Facteurs (n_scenarios, n_annees, 2) pour [ca, charges], mêmes règles que scenario_factors.
+
+    Chaque scénario est un dict de paramètres (global_ca_pct, global_charges_pct,
+    use_per_year, composition, per_year_ca, per_year_charges), comme ceux du
+    store de scénarios. Les % sont d'abord empilés ((k, 2) globaux, (k, n, 2)
+    par année, NaN si absent), puis tous les facteurs sont calculés en un broadcast.
+    """
+    years = np.asarray(years, dtype=np.int64)
+    global_pct = np.array(
+        [[p.get("global_ca_pct", 0), p.get("global_charges_pct", 0)] for p in scenarios], dtype=np.float64
+    ).reshape(len(scenarios), 2)
+    per_year = np.full((len(scenarios), len(years), 2), np.nan)
+    multiply = np.zeros((len(scenarios), 1, 1), dtype=bool)
+    for i, params in enumerate(scenarios):
+        if params.get("composition", "override") not in COMPOSITIONS:
+            raise ValueError(f"composition inconnue : {params['composition']!r}")
+        if params.get("use_per_year"):
+            multiply[i] = params.get("composition") == "multiply"
+            for j, key in enumerate(("per_year_ca", "per_year_charges")):
+                per_year[i, :, j] = year_percentages(years, params.get(key))
+    global_factor = 1.0 + global_pct[:, None, :] / 100.0
+    year_factor = 1.0 + per_year / 100.0
+    return np.where(
+        np.isnan(per_year), global_factor, np.where(multiply, global_factor * year_factor, year_factor)
+    )
+
+
+def compare_scenarios(df_base, scenarios, names=None):
+    """Évalue N scénarios en une passe : cube (N, n_annees, [ca, charges, marge, marge_pct])."""
+    factors = scenario_matrix(df_base["annee"].to_numpy(), scenarios)
+    base = np.stack([df_base["ca"].to_numpy(dtype=np.float64), df_base["charges"].to_numpy(dtype=np.float64)],
+                    axis=-1)
+    cube = np.empty(factors.shape[:2] + (len(SWEEP_METRICS),))
+    np.multiply(factors, base[None, :, :], out=cube[..., :2])
+    np.subtract(cube[..., 0], cube[..., 1], out=cube[..., 2])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(cube[..., 2], cube[..., 0], out=cube[..., 3])
+    return ComparisonResult(
+        names=list(names) if names is not None else [f"Scénario {i + 1}" for i in range(len(scenarios))],
+        years=df_base["annee"].to_numpy(),
+        cube=cube,
+    )
+
+
+# ------------- Monte Carlo -------------
+MC_PERCENTILES = (5, 50, 95)
+
+
+def _monte_carlo_chunk(seed_seq, n_paths, ca, charges, sigma_ca, sigma_charges, rho):
+    """Tire n_paths trajectoires ; retourne (marge, marge_pct), chacun (n_paths, n_annees).
+
+    Chaque année reçoit un choc relatif gaussien, corrélé entre CA et charges
+    (coefficient rho). Les chocs se cumulent d'une année sur l'autre, donc
+    l'incertitude s'élargit avec l'horizon.
+    """
+    rng = np.random.default_rng(seed_seq)
+    z = rng.standard_normal((n_paths, len(ca), 2))
+    shocks_ca = sigma_ca * z[..., 0]
+    shocks_charges = sigma_charges * (rho * z[..., 0] + np.sqrt(1.0 - rho ** 2) * z[..., 1])
+    ca_paths = ca * np.cumprod(1.0 + shocks_ca, axis=1)
+    charges_paths = charges * np.cumprod(1.0 + shocks_charges, axis=1)
+    marge = ca_paths - charges_paths
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marge_pct = marge / ca_paths
+    return marge, marge_pct
+
+
+def process_pool(n_workers):
+    """Pool de processus lancés par "spawn" : un fork du serveur Streamlit (multithreadé)
+    peut hériter d'un verrou tenu par un autre thread et se bloquer."""
+    return ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def monte_carlo(years, ca, charges, n_paths=10_000, sigma_ca=0.05, sigma_charges=0.03,
+                rho=0.5, seed=42, chunk_size=25_000, n_workers=1, pool=None):
+    """Bandes P5 / P50 / P95 de la marge et de la marge % par année.
+
+    Les trajectoires sont générées par blocs de chunk_size, chacun avec sa propre
+    graine dérivée de `seed` (SeedSequence.spawn) : le résultat est identique quel
+    que soit n_workers. Les blocs sont répartis sur `pool` s'il est fourni (pool
+    gardé d'un appel à l'autre), sinon sur un pool temporaire si n_workers > 1.
+    """
+    ca = np.asarray(ca, dtype=np.float64)
+    charges = np.asarray(charges, dtype=np.float64)
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(sq, n, ca, charges, sigma_ca, sigma_charges, rho) for sq, n in zip(seeds, sizes)]
+
+    if pool is not None and len(args) > 1:
+        chunks = list(pool.map(_monte_carlo_chunk, *zip(*args)))
+    elif n_workers > 1 and len(args) > 1:
+        with process_pool(n_workers) as pool:
+            chunks = list(pool.map(_monte_carlo_chunk, *zip(*args)))
+    else:
+        chunks = [_monte_carlo_chunk(*a) for a in args]
+
+    marge = np.concatenate([c[0] for c in chunks])
+    marge_pct = np.concatenate([c[1] for c in chunks])
+    bands = {"annee": np.asarray(years)}
+    for name, paths in (("marge", marge), ("marge_pct", marge_pct)):
+        for p, values in zip(MC_PERCENTILES, np.nanpercentile(paths, MC_PERCENTILES, axis=0)):
+            bands[f"{name}_p{p}"] = values
+    return pd.DataFrame(bands)
@@ -0,0 +1,101 @@
+# test_data_sources.py
+# Les sources (CSV, SQLite, DuckDB) doivent renvoyer les mêmes données pour le même forecast.
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import pytest
+
+from data_sources import CsvSource, DuckDBSource, SqliteSource, StreamingCsvSource, write_sqlite
+from forecast_data import ingest_forecast_stream, load_forecast
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORECAST = os.path.join(ROOT, "bp_forecast_tabulaire.csv")
+LEAVES = ["Chiffre d'affaires", "Rémunérations", "Charges sociales"]
+UNKNOWN = ["Ventes", "Achats"]
+
+
+@pytest.fixture(scope="module")
+def sources(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("sources")
+    csv_path = str(workdir / "forecast.csv")
+    shutil.copy(FORECAST, csv_path)
+    db_path = str(workdir / "forecast.db")
+    write_sqlite(load_forecast(csv_path), db_path)
+    # Ingestion en flux par petits blocs : les sommes partielles de plusieurs blocs sont fusionnées
+    # (StreamingCsvSource réutilise ensuite les fichiers produits, même empreinte de CSV)
+    ingest_forecast_stream(csv_path, chunk_rows=300)
+    found = {
+        "csv": CsvSource(csv_path), "streaming": StreamingCsvSource(csv_path), "sqlite": SqliteSource(db_path),
+    }
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:  # dépendance optionnelle
+        pass
+    else:
+        found["duckdb"] = DuckDBSource(csv_path)
+    return found
+
+
+def _normalized(df, keys):
+    """Colonnes texte en str, dates en datetime64[ns], lignes triées : comparable d'une source à l'autre."""
+    df = df.reset_index(drop=True).copy()
+    for column in ("categorie", "sous_categorie"):
+        if column in df.columns:
+            df[column] = df[column].astype(str)
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"]).astype("datetime64[ns]")
+    return df.sort_values(keys, ignore_index=True)
+
+
+def _assert_all_equal(frames, keys):
+    (reference_name, reference), *others = frames.items()
+    reference = _normalized(reference, keys)
+    for name, df in others:
+        pd.testing.assert_frame_equal(_normalized(df, keys), reference, check_dtype=False,
+                                      obj=f"{name} vs {reference_name}")
+
+
+def test_categories_agree(sources):
+    categories = {name: sorted(source.categories()) for name, source in sources.items()}
+    assert len(set(map(tuple, categories.values()))) == 1, categories
+
+
+@pytest.mark.parametrize("categorie", ["Chiffre d'affaires", "Rémunérations"])
+def test_category_rows_agree(sources, categorie):
+    frames = {name: source.category_rows(categorie) for name, source in sources.items()}
+    assert len(frames["csv"]) > 0
+    _assert_all_equal(frames, ["date", "sous_categorie", "valeur"])
+
+
+@pytest.mark.parametrize("categories", [None, LEAVES, UNKNOWN])
+def test_monthly_totals_agree(sources, categories):
+    frames = {name: source.monthly_totals(categories) for name, source in sources.items()}
+    _assert_all_equal(frames, ["categorie", "date"])
+
+
+def test_yearly_base_agree(sources):
+    frames = {name: source.yearly_base() for name, source in sources.items()}
+    assert len(frames["csv"]) > 0
+    _assert_all_equal(frames, ["annee"])
+
+
+def test_stream_spills_to_temp_dir_when_csv_dir_is_read_only(tmp_path, monkeypatch):
+    csv_dir, temp_dir = tmp_path / "deploiement", tmp_path / "tmp"
+    csv_dir.mkdir()
+    csv_path = str(csv_dir / "forecast.csv")
+    shutil.copy(FORECAST, csv_path)
+    makedirs = os.makedirs
+
+    def read_only_makedirs(name, *args, **kwargs):
+        if str(name).startswith(str(csv_dir)):
+            raise PermissionError(name)
+        return makedirs(name, *args, **kwargs)
+    monkeypatch.setattr(os, "makedirs", read_only_makedirs)
+    monkeypatch.setattr(tempfile, "tempdir", str(temp_dir))
+
+    streamed = ingest_forecast_stream(csv_path, chunk_rows=300)
+    assert streamed.rows_path.startswith(str(temp_dir))
+    expected = CsvSource(csv_path).category_rows("Chiffre d'affaires")
+    assert len(streamed.category_rows("Chiffre d'affaires")) == len(expected)
@@ -0,0 +1,168 @@
+# test_editing.py
+# EditOverlay + IncrementalAggregator : rejoue des séquences d'états de data_editor page par page
+# et compare les agrégats incrémentaux à un groupby de la table matérialisée.
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation import IncrementalAggregator, RollupEngine
+from editing import EditOverlay, page_window, search_and_sort
+
+CATEGORIES = ["Chiffre d'affaires", "Rémunérations", "Charges sociales"]
+MONTHS = pd.date_range("2023-01-01", periods=12, freq="MS")
+
+
+def make_base(n_rows=60, seed=0):
+    """Table partagée au format de category_rows : catégories en dtype category, dates typées."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "categorie": pd.Categorical.from_codes(rng.integers(0, len(CATEGORIES), n_rows), CATEGORIES),
+        "sous_categorie": pd.Categorical.from_codes(rng.integers(0, 4, n_rows), [f"Poste {i}" for i in range(4)]),
+        "valeur": rng.normal(1_000, 300, n_rows).round(2),
+        "date": MONTHS[rng.integers(0, len(MONTHS), n_rows)],
+    })
+
+
+def expected_sums(edited):
+    """Même sémantique que l'agrégateur : clés manquantes ignorées, montants manquants à 0."""
+    edited = edited.astype({"categorie": object})
+    grouped = edited.dropna(subset=["categorie", "date"]).groupby(["categorie", "date"])["valeur"].sum()
+    return {key: total for key, total in grouped.items()}
+
+
+def aggregator_sums(aggregator, categories):
+    return {(categorie, date): total
+            for categorie in categories
+            for date, total in aggregator.totals(categorie).itertuples(index=False, name=None)}
+
+
+def random_page_state(rng, n_page_rows):
+    """État de data_editor pour une page de n_page_rows lignes (positions dans la page)."""
+    state = {"edited_rows": {}, "added_rows": [], "deleted_rows": []}
+    for _ in range(rng.randrange(4)):
+        if not n_page_rows:
+            break
+        i = rng.randrange(n_page_rows)
+        column = rng.choice(["valeur", "valeur", "date", "categorie"])
+        if column == "valeur":
+            value = rng.choice([None, round(rng.uniform(-500, 5_000), 2)])
+        elif column == "date":
+            value = rng.choice([str(rng.choice(MONTHS).date()), "2024-03-15", None])
+        else:
+            value = rng.choice(CATEGORIES + ["Nouvelle catégorie"])
+        state["edited_rows"].setdefault(i, {})[column] = value
+    if n_page_rows and rng.random() < 0.3:
+        state["deleted_rows"] = sorted(rng.sample(range(n_page_rows), k=min(2, n_page_rows)))
+    if rng.random() < 0.3:
+        state["added_rows"].append({
+            "categorie": rng.choice(CATEGORIES), "sous_categorie": "Ajout",
+            "date": str(rng.choice(MONTHS).date()), "valeur": round(rng.uniform(0, 2_000), 2),
+        })
+    return state
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_replayed_pages_match_groupby(seed):
+    rng = random.Random(seed)
+    base = make_base(seed=seed)
+    overlay, aggregator = EditOverlay(len(base)), IncrementalAggregator(base)
+    for _ in range(40):
+        sort_by = rng.choice([None, "date", "valeur", "sous_categorie"])
+        view = search_and_sort(overlay.materialize(base), "", sort_by, rng.random() < 0.5)
+        page_size = rng.choice([5, 10, 25])
+        n_pages = max(1, -(-len(view) // page_size))
+        window = page_window(view, rng.randrange(1, n_pages + 1), page_size)
+        overlay.apply_editor_state(window.index.to_numpy(), random_page_state(rng, len(window)))
+        aggregator.apply(overlay.state())
+
+        expected = expected_sums(overlay.materialize(base))
+        got = aggregator_sums(aggregator, {categorie for categorie, _ in expected} | set(CATEGORIES))
+        assert got.keys() == expected.keys()
+        assert np.allclose([got[k] for k in expected], list(expected.values()))
+
+
+def test_page_rows_map_to_row_ids():
+    base = make_base()
+    overlay = EditOverlay(len(base))
+    view = search_and_sort(overlay.materialize(base), "", "valeur", False)
+    window = page_window(view, 2, 10)
+    row_ids = window.index.to_numpy()
+    overlay.apply_editor_state(row_ids, {"edited_rows": {0: {"valeur": -1.0}}, "deleted_rows": [9]})
+
+    assert overlay.edited_rows == {int(row_ids[0]): {"valeur": -1.0}}
+    assert overlay.deleted_rows == {int(row_ids[9])}
+    edited = overlay.materialize(base)
+    assert edited.loc[row_ids[0], "valeur"] == -1.0
+    assert row_ids[9] not in edited.index
+
+
+def test_added_then_deleted_rows_keep_ids():
+    base = make_base()
+    n_base = len(base)
+    overlay, aggregator = EditOverlay(n_base), IncrementalAggregator(base)
+    added = [{"categorie": "Chiffre d'affaires", "date": "2023-01-01", "valeur": v} for v in (10.0, 20.0)]
+    overlay.apply_editor_state(np.array([], dtype=int), {"added_rows": added})
+    assert list(overlay.materialize(base).index[-2:]) == [n_base, n_base + 1]
+
+    # Suppression de la première ligne ajoutée, depuis une page qui l'affiche
+    window = page_window(overlay.materialize(base), 1, n_base + 2).tail(2)
+    overlay.apply_editor_state(window.index.to_numpy(), {"deleted_rows": [0]})
+    assert overlay.added_rows[0] is None
+    assert overlay.state()["added_rows"][0] is None
+
+    # La seconde garde son identifiant n_base + 1 et reste modifiable
+    edited = overlay.materialize(base)
+    assert n_base not in edited.index and n_base + 1 in edited.index
+    overlay.apply_editor_state(np.array([n_base + 1]), {"edited_rows": {0: {"valeur": 25.0}}})
+    edited = overlay.materialize(base)
+    assert edited.loc[n_base + 1, "valeur"] == 25.0
+
+    aggregator.apply(overlay.state())
+    assert aggregator_sums(aggregator, CATEGORIES) == pytest.approx(expected_sums(edited))
+
+
+def test_new_category_is_added_to_categorical():
+    base = make_base()
+    overlay = EditOverlay(len(base))
+    overlay.apply_editor_state(np.arange(len(base)), {"edited_rows": {3: {"categorie": "Nouvelle catégorie"}}})
+    edited = overlay.materialize(base)
+    assert isinstance(edited["categorie"].dtype, pd.CategoricalDtype)
+    assert edited.loc[3, "categorie"] == "Nouvelle catégorie"
+    assert "Nouvelle catégorie" not in base["categorie"].cat.categories
+
+
+def test_shared_base_is_never_mutated():
+    base = make_base()
+    snapshot = base.copy(deep=True)
+    overlay, aggregator = EditOverlay(len(base)), IncrementalAggregator(base)
+    rng = random.Random(0)
+    for _ in range(20):
+        window = page_window(overlay.materialize(base), rng.randrange(1, 4), 20)
+        overlay.apply_editor_state(window.index.to_numpy(), random_page_state(rng, len(window)))
+        aggregator.apply(overlay.state())
+    overlay.materialize(base)
+    pd.testing.assert_frame_equal(base, snapshot)
+
+
+def test_rollup_follows_mid_month_edits():
+    base = make_base()
+    base = base[base["categorie"].isin(RollupEngine().leaves)].reset_index(drop=True)
+    rollup = RollupEngine().compute(base)
+    overlay = EditOverlay(len(base))
+    aggregator = IncrementalAggregator(base, on_delta=rollup.update_leaf)
+    overlay.apply_editor_state(np.arange(len(base)), {
+        "edited_rows": {0: {"date": "2023-02-15"}, 1: {"valeur": 0.0}},
+        "added_rows": [{"categorie": "Chiffre d'affaires", "date": "2024-06-20", "valeur": 500.0}],
+    })
+    aggregator.apply(overlay.state())
+
+    edited = overlay.materialize(base)
+    monthly = edited.assign(date=edited["date"].dt.to_period("M").dt.to_timestamp())
+    expected = RollupEngine().compute(monthly).frame()
+    got = rollup.frame()
+    # Les colonnes vidées par l'édition restent à 0 dans le calcul incrémental
+    got = got.reindex(expected.index.union(got.index), fill_value=0.0)
+    expected = expected.reindex(got.index, fill_value=0.0)
+    pd.testing.assert_frame_equal(got, expected, check_freq=False)
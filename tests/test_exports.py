@@ -0,0 +1,29 @@
+# test_exports.py
+import io
+import re
+import zipfile
+
+import pandas as pd
+import pytest
+
+import exports
+
+pytest.importorskip("xlsxwriter")
+
+
+def _sheet_rows(data):
+    """{nom de feuille: lignes de données} d'un classeur XLSX."""
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    names = re.findall(r'<sheet name="([^"]+)"', archive.read("xl/workbook.xml").decode("utf-8"))
+    return {
+        name: archive.read(f"xl/worksheets/sheet{i}.xml").decode("utf-8").count("<row ") - 1
+        for i, name in enumerate(names, start=1)
+    }
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_xlsx_keeps_every_row(monkeypatch, dtype):
+    monkeypatch.setattr(exports, "XLSX_MAX_ROWS", 3)
+    df = pd.DataFrame({"categorie": ["A"] * 7 + [None] * 2 + ["B"], "valeur": range(10)})
+    rows = _sheet_rows(exports.export_bytes(df.astype({"categorie": dtype}), "xlsx"))
+    assert rows == {"A": 3, "A (2)": 3, "A (3)": 1, exports.XLSX_NO_CATEGORY: 2, "B": 1}
@@ -0,0 +1,38 @@
+# test_profiling.py
+from profiling import RerunProfiler
+
+
+def test_fragment_rerun_gets_its_own_profiler(monkeypatch):
+    finished = []
+
+    def finish(self):
+        self._finished = True
+        finished.append(self)
+    monkeypatch.setattr(RerunProfiler, "finish", finish)
+    profiler = RerunProfiler("timings")
+
+    @profiler.fragment
+    def view():
+        with profiler.section("figures"):
+            pass
+
+    # Rerun complet : le fragment compte dans le rerun
+    view()
+    profiler.finish()
+    assert set(profiler.timings) == {"figures"}
+    timings = dict(profiler.timings)
+
+    # Rerun du fragment seul : profileur propre, terminé à la fin du fragment
+    view()
+    assert profiler.timings == timings
+    fragment_run = finished[-1]
+    assert fragment_run is not profiler and fragment_run.fragment_name == "view"
+    assert set(fragment_run.timings) == {"figures"}
+    assert profiler._fragment_run is None
+
+
+def test_disabled_profiler_fragment_is_transparent():
+    profiler = RerunProfiler(None)
+    view = profiler.fragment(lambda: 42)
+    profiler.finish()
+    assert view() == 42 and profiler.timings == {}
@@ -0,0 +1,84 @@
+# test_scenarios.py
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from editing import EditOverlay
+from scenarios import ScenarioStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ScenarioStore(str(tmp_path / "scenarios.db"))
+
+
+@pytest.fixture
+def base():
+    return pd.DataFrame({
+        "categorie": pd.Categorical(["Chiffre d'affaires"] * 4),
+        "sous_categorie": pd.Categorical(["A", "B", "A", "B"]),
+        "valeur": [100.0, 200.0, 300.0, 400.0],
+        "date": pd.to_datetime(["2024-01-01", "2024-02-01", "2024-03-01", "2024-04-01"]),
+    })
+
+
+def _count_deltas(store):
+    with sqlite3.connect(store.path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM scenario_deltas").fetchone()[0]
+
+
+def test_round_trip_with_deleted_added_rows(store, base):
+    overlay = EditOverlay(len(base))
+    added = [{"categorie": "Chiffre d'affaires", "sous_categorie": "C", "date": "2024-05-01", "valeur": v}
+             for v in (1.0, 2.0)]
+    overlay.apply_editor_state(np.arange(len(base)), {
+        "edited_rows": {1: {"valeur": 250.0}}, "deleted_rows": [2], "added_rows": added,
+    })
+    # Première ligne ajoutée puis supprimée : None dans added_rows
+    overlay.apply_editor_state(np.array([len(base)]), {"deleted_rows": [0]})
+    assert overlay.state()["added_rows"][0] is None
+
+    scenario_id = store.save("budget", "edition", {"categorie": "Chiffre d'affaires"},
+                             base_version=["f.csv", 1, 2], delta=overlay.state(), base_rows=len(base))
+    scenario = store.load(scenario_id)
+    assert scenario.params == {"categorie": "Chiffre d'affaires"}
+    assert scenario.base_rows == len(base)
+    assert scenario.matches_version(("f.csv", 1, 2))
+    assert scenario.delta["edited_rows"] == {1: {"valeur": 250.0}}
+    assert scenario.delta["deleted_rows"] == [2]
+    assert scenario.delta["added_rows"] == [added[1]]
+
+    # L'overlay reconstruit donne la même table éditée
+    rebuilt = EditOverlay.from_state(scenario.base_rows, scenario.delta)
+    expected = overlay.materialize(base).reset_index(drop=True)
+    pd.testing.assert_frame_equal(rebuilt.materialize(base).reset_index(drop=True), expected)
+
+
+def test_save_replaces_same_kind_and_name(store):
+    first = store.save("plan A", "edition", {"categorie": "X"}, delta={"deleted_rows": [0, 1]})
+    second = store.save("plan A", "edition", {"categorie": "Y"}, delta={"deleted_rows": [2]})
+    other_kind = store.save("plan A", "simulation", {"global_ca_pct": 5})
+    listed = store.list()
+    assert sorted(listed["id"]) == sorted([second, other_kind])
+    assert store.load(second).params == {"categorie": "Y"}
+    assert store.load(second).delta["deleted_rows"] == [2]
+    assert _count_deltas(store) == 1  # les deltas du scénario remplacé sont supprimés avec lui
+    with pytest.raises(KeyError):
+        store.load(first)
+
+
+def test_delete_cascades_to_deltas(store):
+    scenario_id = store.save("edits", "edition", {}, delta={
+        "edited_rows": {0: {"valeur": 1.0}}, "added_rows": [{"valeur": 2.0}], "deleted_rows": [3],
+    })
+    assert _count_deltas(store) == 3
+    store.delete(scenario_id)
+    assert _count_deltas(store) == 0
+    assert store.list().empty
+
+
+def test_unknown_kind_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.save("x", "autre", {})
@@ -0,0 +1,124 @@
+# test_simulation.py
+# Le moteur vectorisé doit reproduire l'ancien calcul ligne à ligne (df.apply), et les
+# évaluations groupées (balayage, comparaison, Monte Carlo) les scénarios pris un par un.
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulation import COMPOSITIONS, compare_scenarios, monte_carlo, process_pool, simulate, sweep_scenarios
+
+YEARS = list(range(2023, 2029))
+
+
+@pytest.fixture
+def base():
+    rng = np.random.default_rng(0)
+    ca = rng.uniform(800_000, 1_200_000, len(YEARS))
+    return pd.DataFrame({"annee": YEARS, "ca": ca, "charges": ca * rng.uniform(0.55, 0.65, len(YEARS))})
+
+
+def legacy_simulate(df_base, global_ca_pct, global_charges_pct, per_year_ca=None, per_year_charges=None):
+    """Calcul d'origine de l'app : global, puis overrides par année ligne à ligne."""
+    df = df_base.copy()
+    df["ca_simu"] = df["ca"] * (1 + global_ca_pct / 100.0)
+    df["charges_simu"] = df["charges"] * (1 + global_charges_pct / 100.0)
+    if per_year_ca is not None:
+        df["ca_simu"] = df.apply(lambda r: r["ca"] * (1 + per_year_ca[int(r["annee"])] / 100.0), axis=1)
+        df["charges_simu"] = df.apply(
+            lambda r: r["charges"] * (1 + per_year_charges[int(r["annee"])] / 100.0), axis=1
+        )
+    df["marge_simu"] = df["ca_simu"] - df["charges_simu"]
+    df["marge_pct_simu"] = df["marge_simu"] / df["ca_simu"]
+    return df
+
+
+def test_global_only_matches_legacy(base):
+    pd.testing.assert_frame_equal(simulate(base, 7, -4), legacy_simulate(base, 7, -4))
+
+
+def test_override_matches_legacy(base):
+    per_year_ca = {y: (y % 5) - 2 for y in YEARS}
+    per_year_charges = {y: 3 - (y % 4) for y in YEARS}
+    expected = legacy_simulate(base, 10, 10, per_year_ca, per_year_charges)
+    got = simulate(base, 10, 10, per_year_ca, per_year_charges, composition="override")
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def test_override_keeps_global_for_missing_years(base):
+    got = simulate(base, 10, -5, {2024: 3}, {2025: 0}, composition="override")
+    assert np.allclose(got["ca_simu"] / base["ca"], [1.10, 1.03, 1.10, 1.10, 1.10, 1.10])
+    assert np.allclose(got["charges_simu"] / base["charges"], [0.95, 0.95, 1.00, 0.95, 0.95, 0.95])
+
+
+def test_multiply_chains_global_and_year(base):
+    got = simulate(base, 10, -5, {2024: 20}, {2026: -10}, composition="multiply")
+    assert np.allclose(got["ca_simu"] / base["ca"], [1.10, 1.10 * 1.20, 1.10, 1.10, 1.10, 1.10])
+    assert np.allclose(got["charges_simu"] / base["charges"], [0.95, 0.95, 0.95, 0.95 * 0.90, 0.95, 0.95])
+
+
+@pytest.mark.parametrize("composition", sorted(COMPOSITIONS))
+def test_string_year_keys_like_json(base, composition):
+    # Les dicts relus d'un scénario JSON ont des clés texte
+    with_ints = simulate(base, 2, 1, {2024: 5, 2027: -3}, {2025: 4}, composition=composition)
+    with_text = simulate(base, 2, 1, {"2024": 5, "2027": -3}, {"2025": 4}, composition=composition)
+    pd.testing.assert_frame_equal(with_text, with_ints)
+
+
+def test_unknown_composition_is_rejected(base):
+    with pytest.raises(ValueError):
+        simulate(base, 0, 0, {2024: 1}, None, composition="average")
+
+
+@pytest.mark.parametrize("composition", sorted(COMPOSITIONS))
+def test_compare_scenarios_matches_simulate(base, composition):
+    scenarios = [
+        {"global_ca_pct": 0, "global_charges_pct": 0},
+        {"global_ca_pct": 5, "global_charges_pct": -2, "use_per_year": False, "per_year_ca": {"2024": 50}},
+        {"global_ca_pct": 5, "global_charges_pct": -2, "use_per_year": True, "composition": composition,
+         "per_year_ca": {"2024": 8, "2026": -1}, "per_year_charges": {"2028": 3}},
+        {"global_ca_pct": -10, "global_charges_pct": 4, "use_per_year": True, "composition": composition,
+         "per_year_ca": {}, "per_year_charges": {str(y): 1 for y in YEARS}},
+    ]
+    result = compare_scenarios(base, scenarios)
+    for i, params in enumerate(scenarios):
+        per_year = params.get("use_per_year")
+        expected = simulate(
+            base, params["global_ca_pct"], params["global_charges_pct"],
+            params.get("per_year_ca") if per_year else None,
+            params.get("per_year_charges") if per_year else None,
+            composition=params.get("composition", "override"),
+        )
+        for metric in ("ca_simu", "charges_simu", "marge_simu", "marge_pct_simu"):
+            assert np.allclose(result.series(metric).iloc[:, i], expected[metric]), (i, metric)
+
+
+def test_sweep_surface_indexing_and_cumulative_margin(base):
+    ca_pcts, charges_pcts = [-10, 0, 15], [-5, 5]
+    sweep = sweep_scenarios(base, ca_pcts, charges_pcts)
+    for i, ca_pct in enumerate(ca_pcts):
+        for j, charges_pct in enumerate(charges_pcts):
+            expected = simulate(base, ca_pct, charges_pct)
+            assert sweep.surface("marge_simu", year=2025)[i, j] == pytest.approx(
+                expected.loc[expected["annee"] == 2025, "marge_simu"].item()
+            )
+            assert sweep.surface("ca_simu")[i, j] == pytest.approx(expected["ca_simu"].sum())
+            # marge % cumulée : marge cumulée / CA cumulé (pas la moyenne des marges %)
+            assert sweep.surface("marge_pct_simu")[i, j] == pytest.approx(
+                expected["marge_simu"].sum() / expected["ca_simu"].sum()
+            )
+
+
+def test_monte_carlo_does_not_depend_on_workers(base):
+    kwargs = dict(n_paths=2_000, chunk_size=500, seed=7)
+    serial = monte_carlo(base["annee"], base["ca"], base["charges"], n_workers=1, **kwargs)
+    parallel = monte_carlo(base["annee"], base["ca"], base["charges"], n_workers=2, **kwargs)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_monte_carlo_reuses_given_pool(base):
+    kwargs = dict(n_paths=2_000, chunk_size=500, seed=7)
+    serial = monte_carlo(base["annee"], base["ca"], base["charges"], **kwargs)
+    with process_pool(2) as pool:
+        for _ in range(2):  # même pool d'un appel à l'autre
+            pooled = monte_carlo(base["annee"], base["ca"], base["charges"], pool=pool, **kwargs)
+            pd.testing.assert_frame_equal(serial, pooled)